@@ -0,0 +1,75 @@
+"""视频质量分析耗时测试
+
+用法：
+    python benchmark_quality.py                    # 生成 30 秒和 5 分钟测试视频并测试
+    python benchmark_quality.py a.mp4 b.mp4 ...    # 测试指定视频
+
+分析固定抽取 16 帧，耗时基本按“每个视频”计，而不是随时长线性增长，
+因此输出每个视频的耗时，并用不同时长的视频观察其变化。
+
+注意：抽帧靠 seek 到关键帧后再解码到目标帧，耗时很大程度取决于关键帧间隔（GOP）。
+这里生成的 mp4v 测试视频关键帧很密，手机录制的 H.264 关键帧间隔通常为 1-2 秒甚至更长，
+实际耗时可能更高，应以真实录像测试为准。
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from server.video_quality import read_samples, score_frames
+
+DURATIONS = (30, 300)
+
+
+def make_test_video(path: str, seconds: int = 60, fps: int = 30, size=(1280, 720)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(seconds * fps):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+def bench(path: str, sample_count: int = 16, rounds: int = 5):
+    decode_times = []
+    score_times = []
+    duration = 0.0
+    result = {}
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        frames, duration = read_samples(path, sample_count, (160, 90))
+        t1 = time.perf_counter()
+        result = score_frames(frames)
+        t2 = time.perf_counter()
+        decode_times.append(t1 - t0)
+        score_times.append(t2 - t1)
+
+    decode = min(decode_times)
+    score = min(score_times)
+    print(f"视频：{path}")
+    print(f"时长：{duration:.1f} 秒，采样帧：{result['samples']}")
+    print(f"抽帧解码：{decode * 1000:.1f} ms")
+    print(f"NumPy 评分：{score * 1000:.2f} ms")
+    print(f"每个视频耗时：{(decode + score) * 1000:.1f} ms")
+    print(f"结果：{result}")
+    print()
+
+
+def main():
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            bench(path)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in DURATIONS:
+            path = str(Path(tmp) / f"bench_{seconds}s.mp4")
+            print(f"正在生成 {seconds} 秒测试视频...")
+            make_test_video(path, seconds)
+            bench(path)
+
+
+if __name__ == "__main__":
+    main()
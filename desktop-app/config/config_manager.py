@@ -8,7 +8,8 @@ class ConfigManager:
     DEFAULT_CONFIG = {
         "save_path": str(Path.home() / "Videos" / "ExpressVideo"),
         "port": 8080,
-        "auto_start": True
+        "auto_start": True,
+        "quality_check": False
     }
 
     def __init__(self, config_dir: Optional[str] = None):
@@ -64,6 +65,15 @@ class ConfigManager:
         self._config["auto_start"] = auto
         self.save_config()
 
+    @property
+    def quality_check(self) -> bool:
+        return self._config.get("quality_check", self.DEFAULT_CONFIG["quality_check"])
+
+    @quality_check.setter
+    def quality_check(self, enabled: bool):
+        self._config["quality_check"] = enabled
+        self.save_config()
+
     def get(self, key: str, default=None):
         return self._config.get(key, default)
 
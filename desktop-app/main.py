@@ -112,6 +112,7 @@ class ServerThread(QThread):
 
 class MainWindow(QMainWindow):
     file_received_signal = pyqtSignal(str, str, str)
+    error_signal = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
@@ -126,6 +127,7 @@ class MainWindow(QMainWindow):
         
         # 连接信号
         self.file_received_signal.connect(self._handle_file_received_ui)
+        self.error_signal.connect(self._handle_error_ui)
 
     def _init_ui(self):
         self.setWindowTitle("快递视频接收器")
@@ -333,7 +335,8 @@ class MainWindow(QMainWindow):
                 save_path=save_path,
                 port=port,
                 on_file_received=self._on_file_received,
-                on_error=self._on_error
+                on_error=self._on_error,
+                quality_check=self.config_manager.quality_check
             )
 
             self.server.start()
@@ -392,6 +395,10 @@ class MainWindow(QMainWindow):
         dialog.show()  # 使用 show 而不是 exec_，这样不会阻塞后续操作
 
     def _on_error(self, error: str):
+        # 可能在服务器线程或质量分析线程中调用，发射信号到主线程
+        self.error_signal.emit(error)
+
+    def _handle_error_ui(self, error: str):
         self._log(f"错误：{error}")
 
     def _log(self, message: str):
@@ -1,6 +1,9 @@
+import json
 import os
 import socket
 import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Optional
@@ -8,6 +11,9 @@ from typing import Callable, Optional
 from flask import Flask, request, jsonify
 from werkzeug.utils import secure_filename
 
+from server.ingest_journal import IngestJournal, part_path_for, write_durable
+from server.video_quality import QualityAnalyzer, is_available as quality_available
+
 
 def is_port_in_use(port: int) -> bool:
     """检查端口是否被占用"""
@@ -21,17 +27,31 @@ def is_port_in_use(port: int) -> bool:
 
 
 class HttpServer:
+    MAX_RECORDS = 500  # 内存中最多保留的上传记录数，更早的可从 .quality.json 读取
+
     def __init__(
         self,
         save_path: str,
         port: int = 8080,
         on_file_received: Optional[Callable[[str, str, str], None]] = None,
-        on_error: Optional[Callable[[str], None]] = None
+        on_error: Optional[Callable[[str], None]] = None,
+        quality_check: bool = False
     ):
         self.save_path = Path(save_path)
         self.port = port
         self.on_file_received = on_file_received
         self.on_error = on_error
+        self.journal: Optional[IngestJournal] = None
+
+        # 上传记录（文件名 -> 记录），质量分析结果会回写到这里
+        self._records: "OrderedDict[str, dict]" = OrderedDict()
+        self._records_lock = threading.Lock()
+        self.quality_analyzer: Optional[QualityAnalyzer] = None
+        if quality_check:
+            if quality_available():
+                self.quality_analyzer = QualityAnalyzer()
+            else:
+                print("未安装 opencv/numpy，已禁用视频质量分析")
 
         self.app = Flask(__name__)
         self.server_thread: Optional[threading.Thread] = None
@@ -43,6 +63,22 @@ class HttpServer:
 
     def _ensure_save_path(self):
         self.save_path.mkdir(parents=True, exist_ok=True)
+        if self.journal is None or self.journal.directory != self.save_path:
+            if self.journal:
+                self.journal.stop()
+            self.journal = IngestJournal(self.save_path)
+
+    def _recover(self):
+        result = self.journal.recover()
+        for name in result["restored"]:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 已恢复断电前完成的上传：{name}")
+        for name in result["incomplete"]:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 已清理未完成的上传：{name}")
+        for name in result["stale"]:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 已清理重复的临时文件：{name}")
+        if result["missing"] and self.on_error:
+            # 缺失的记录已从日志中移除，每个文件只提示一次
+            self.on_error(f"日志中记录的 {len(result['missing'])} 个视频已不存在：{', '.join(result['missing'])}")
 
     def _setup_routes(self):
         @self.app.before_request
@@ -76,9 +112,29 @@ class HttpServer:
                     filename += '.mp4'
 
                 filepath = self.save_path / filename
+                part_path = part_path_for(filepath, uuid.uuid4().hex[:8])
 
+                # 先写 .part 并 fsync，再原子 rename，最后写入日志；
+                # 日志落盘前不向客户端报告成功
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 保存文件：{filepath}")
-                file.save(str(filepath))
+                try:
+                    write_durable(file, part_path)
+                    os.replace(part_path, filepath)
+                except Exception:
+                    if part_path.exists():
+                        part_path.unlink()
+                    raise
+                try:
+                    self.journal.commit({
+                        "filename": filename,
+                        "tracking_number": tracking_number,
+                        "size": os.path.getsize(filepath),
+                        "completed_at": datetime.now().isoformat(timespec="seconds")
+                    })
+                except Exception:
+                    # 未记入日志的文件不能留在正式文件名下，否则看起来像上传成功
+                    filepath.unlink()
+                    raise
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 保存成功，正在复查视频...")
 
                 # 视频复查逻辑
@@ -105,6 +161,23 @@ class HttpServer:
                 
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] {verify_msg}")
 
+                # disabled：未开启质量检查；skipped：开启了但视频无法读取，未分析
+                quality_status = "disabled"
+                if self.quality_analyzer:
+                    quality_status = "pending" if is_verified else "skipped"
+                record = {
+                    "tracking_number": tracking_number,
+                    "filename": filename,
+                    "path": str(filepath),
+                    "verified": is_verified,
+                    "duration": round(duration, 2),
+                    "quality_status": quality_status,
+                    "quality": None
+                }
+                self._save_record(filename, record)
+                if quality_status == "pending":
+                    self._submit_quality(record)
+
                 if self.on_file_received:
                     self.on_file_received(
                         tracking_number,
@@ -117,6 +190,7 @@ class HttpServer:
                     "verified": is_verified,
                     "duration": round(duration, 2),
                     "message": verify_msg,
+                    "quality_status": quality_status,
                     "filename": filename,
                     "path": str(filepath)
                 })
@@ -138,6 +212,90 @@ class HttpServer:
                 "port": self.port
             })
 
+        @self.app.route('/records/<filename>', methods=['GET'])
+        def get_record(filename):
+            record = self.get_record(filename)
+            if record is None:
+                return jsonify({"error": "Record not found"}), 404
+            return jsonify(record)
+
+    def _save_record(self, filename: str, record: dict):
+        with self._records_lock:
+            self._records[filename] = record
+            self._records.move_to_end(filename)
+            while len(self._records) > self.MAX_RECORDS:
+                self._records.popitem(last=False)
+
+    def get_record(self, filename: str) -> Optional[dict]:
+        with self._records_lock:
+            record = self._records.get(filename)
+            if record:
+                return dict(record)
+
+        # 重启后或已移出内存的记录，从视频旁的 .quality.json 读取
+        if Path(filename).name != filename or filename in ('.', '..'):
+            return None
+        sidecar = (self.save_path / filename).with_suffix(".quality.json")
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+
+    def _write_sidecar(self, record: dict):
+        # 结果与视频放在一起，便于事后追溯
+        sidecar = Path(record["path"]).with_suffix(".quality.json")
+        try:
+            with open(sidecar, 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2, ensure_ascii=False)
+        except IOError as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 保存质量结果失败：{e}")
+
+    def _submit_quality(self, record: dict):
+        # 先写入 pending 状态，程序重启后可据此重新分析
+        with self._records_lock:
+            snapshot = dict(record)
+        self._write_sidecar(snapshot)
+        self.quality_analyzer.submit(
+            record["path"],
+            lambda result, rec=record: self._on_quality_done(rec, result)
+        )
+
+    def _requeue_pending(self):
+        """重新提交上次退出前尚未分析完的视频"""
+        for sidecar in self.save_path.glob("*.quality.json"):
+            try:
+                with open(sidecar, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (IOError, json.JSONDecodeError):
+                continue
+            if record.get("quality_status") != "pending":
+                continue
+            video = self.save_path / record.get("filename", "")
+            if not video.is_file():
+                continue
+            record["path"] = str(video)
+            self._save_record(record["filename"], record)
+            self._submit_quality(record)
+
+    def _on_quality_done(self, record: dict, result: dict):
+        # 记录可能已被移出内存，直接更新提交时持有的对象
+        filename = record["filename"]
+        with self._records_lock:
+            record["quality"] = result
+            record["quality_status"] = "error" if "error" in result else "done"
+            snapshot = dict(record)
+        self._write_sidecar(snapshot)
+
+        if result.get("passed"):
+            msg = f"质量检查通过：{filename}"
+        else:
+            issues = "、".join(result.get("issues", [])) or result.get("error", "未知原因")
+            msg = f"质量检查未通过：{filename}（{issues}）"
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+        if not result.get("passed") and self.on_error:
+            self.on_error(msg)
+
     def set_save_path(self, path: str):
         self.save_path = Path(path)
         self._ensure_save_path()
@@ -149,7 +307,14 @@ class HttpServer:
         if is_port_in_use(self.port):
             raise Exception(f"端口 {self.port} 已被占用，请关闭其他程序或更换端口")
 
+        self._ensure_save_path()
+        self._recover()
+        self.journal.start()
+
         self.is_running = True
+        if self.quality_analyzer:
+            self.quality_analyzer.start()
+            self._requeue_pending()
         try:
             self.server_thread = threading.Thread(
                 target=lambda: self.app.run(
@@ -167,3 +332,7 @@ class HttpServer:
 
     def stop(self):
         self.is_running = False
+        if self.journal:
+            self.journal.stop()
+        if self.quality_analyzer:
+            self.quality_analyzer.stop()
@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+PART_SUFFIX = ".part"
+# 只认本程序生成的临时文件：<文件名>.mp4.<8 位十六进制>.part，
+# 保存目录中其他 .part（如浏览器下载）不做处理
+PART_PATTERN = re.compile(r"^(.+\.mp4)\.[0-9a-f]{8}\.part$")
+
+
+def part_path_for(final_path: Path, token: str) -> Path:
+    """上传中的临时文件：<最终文件名>.<token>.part，同名并发上传互不覆盖"""
+    return final_path.with_name(f"{final_path.name}.{token}{PART_SUFFIX}")
+
+
+def final_name_for(part_path: Path) -> Optional[str]:
+    match = PART_PATTERN.match(part_path.name)
+    return match.group(1) if match else None
+
+
+def write_durable(file_storage, part_path: Path):
+    """把上传内容写入 .part 文件并 fsync，保证数据已落盘"""
+    with open(part_path, "wb") as f:
+        file_storage.save(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def fsync_dir(directory: Path):
+    """fsync 目录使 rename 持久化；Windows 不支持打开目录，忽略即可"""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _PendingCommit:
+    __slots__ = ("record", "done", "error")
+
+    def __init__(self, record: dict):
+        self.record = record
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+class IngestJournal:
+    """已完成上传的追加式日志
+
+    并发上传的提交请求由后台线程成批写入，每批只做一次目录 fsync 和一次
+    日志 fsync（组提交），调用方在所在批次落盘后才返回。目录先于日志同步，
+    因此日志中的每条记录都意味着对应的文件已经在磁盘上。
+    """
+
+    JOURNAL_NAME = ".ingest_journal.jsonl"
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.journal_file = self.directory / self.JOURNAL_NAME
+        # 文件名 -> 日志记录
+        self.completed: Dict[str, dict] = {}
+        self._pending: List[_PendingCommit] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._load()
+
+    def _load(self):
+        if not self.journal_file.exists():
+            return
+        with open(self.journal_file, "rb+") as f:
+            data = f.read()
+            # 断电时最后一行可能只写了一半，截掉以免和下一条记录粘连
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            try:
+                record = json.loads(line)
+                self.completed[record["filename"]] = record
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+
+    def _ensure_worker(self):
+        # 调用方需持有 self._cond
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def start(self):
+        with self._cond:
+            self._running = True
+            self._ensure_worker()
+
+    def stop(self):
+        """停止后台线程；已排队的提交会先写完"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def commit(self, record: dict):
+        """记录一次已 rename 到位的上传，阻塞直到日志和目录都已落盘"""
+        pending = _PendingCommit(record)
+        with self._cond:
+            self._pending.append(pending)
+            # 入队和检查工作线程在同一把锁内完成，避免与 stop() 竞争导致无人处理
+            self._ensure_worker()
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error:
+            raise pending.error
+        with self._cond:
+            self.completed[record["filename"]] = record
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    # 已停止且队列清空才退出
+                    self._thread = None
+                    return
+                batch, self._pending = self._pending, []
+
+            error = None
+            try:
+                # 先让本批的 rename 落盘，再写日志
+                fsync_dir(self.directory)
+                created = not self.journal_file.exists()
+                lines = "".join(
+                    json.dumps(p.record, ensure_ascii=False) + "\n" for p in batch
+                )
+                with open(self.journal_file, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if created:
+                    fsync_dir(self.directory)
+            except Exception as e:
+                error = e
+
+            for p in batch:
+                p.error = error
+                p.done.set()
+
+    def recover(self) -> dict:
+        """启动时核对残留的 .part 文件与日志
+
+        .part 从未被 rename，说明该次上传没有向客户端报告成功：
+        - 日志中有完成记录但最终文件缺失、且大小一致：rename 落盘前断电，补做 rename；
+        - 日志中有完成记录且最终文件存在：多余副本，删除；
+        - 其余为中断的上传，删除。
+        日志中记录过但最终文件已不存在的（如已归档或删除）只报告一次，
+        随后从日志中移除，避免每次启动重复提示。
+        """
+        restored = []
+        incomplete = []
+        stale = []
+        for part in sorted(self.directory.glob(f"*{PART_SUFFIX}")):
+            final_name = final_name_for(part)
+            if final_name is None:
+                continue
+            final_path = self.directory / final_name
+            entry = self.completed.get(final_name)
+            try:
+                if entry and not final_path.exists() and part.stat().st_size == entry.get("size"):
+                    os.replace(part, final_path)
+                    restored.append(final_name)
+                    continue
+                part.unlink()
+            except OSError as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 无法处理残留文件 {part.name}：{e}")
+                continue
+            if entry and final_path.exists():
+                stale.append(part.name)
+            else:
+                incomplete.append(part.name)
+        if restored:
+            fsync_dir(self.directory)
+
+        missing = sorted(
+            name for name in self.completed
+            if not (self.directory / name).exists()
+        )
+        if missing:
+            for name in missing:
+                del self.completed[name]
+            self._compact()
+        return {"restored": restored, "incomplete": incomplete, "stale": stale, "missing": missing}
+
+    def _compact(self):
+        """用当前记录重写日志：先写临时文件并 fsync，再原子替换"""
+        tmp = self.journal_file.with_name(self.journal_file.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in self.completed.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_file)
+        fsync_dir(self.directory)
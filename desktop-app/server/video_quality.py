@@ -0,0 +1,151 @@
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+
+# 判定阈值（灰度 0-255，基于低分辨率采样帧）
+BLACK_LEVEL = 24            # 帧内 95% 像素低于该亮度视为黑帧
+BLUR_THRESHOLD = 60.0       # 拉普拉斯方差低于该值视为模糊
+FROZEN_THRESHOLD = 1.5      # 相邻采样帧平均差低于该值视为画面静止
+MAX_BLACK_RATIO = 0.5
+MAX_BLUR_RATIO = 0.6
+MAX_FROZEN_RATIO = 0.8
+
+
+def read_samples(path: str, sample_count: int, size: Tuple[int, int]):
+    """均匀抽取 sample_count 帧，缩放为 size 的灰度图，返回 (K, H, W) 数组和时长"""
+    import cv2
+    import numpy as np
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("无法打开视频文件")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if fps <= 0 or frame_count <= 0:
+            raise ValueError("无法读取帧信息")
+
+        indices = np.unique(np.linspace(0, frame_count - 1, sample_count).astype(int))
+        frames = []
+        for index in indices:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            frames.append(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+    finally:
+        cap.release()
+
+    if not frames:
+        raise ValueError("未能解码任何帧")
+    return np.stack(frames).astype(np.float32), frame_count / fps
+
+
+def score_frames(frames) -> dict:
+    """对 (K, H, W) 灰度帧批量计算质量指标，全部为向量化 NumPy 运算"""
+    import numpy as np
+
+    k = frames.shape[0]
+    brightness = frames.mean(axis=(1, 2))
+    black = np.percentile(frames.reshape(k, -1), 95, axis=1) < BLACK_LEVEL
+
+    # 4 邻域拉普拉斯，一次处理所有帧
+    lap = (frames[:, :-2, 1:-1] + frames[:, 2:, 1:-1]
+           + frames[:, 1:-1, :-2] + frames[:, 1:-1, 2:]
+           - 4.0 * frames[:, 1:-1, 1:-1])
+    sharpness = lap.var(axis=(1, 2))
+    lit = ~black
+    blurry = (sharpness < BLUR_THRESHOLD) & lit
+
+    # 只比较相邻的两帧都不是黑帧的情况，黑屏已单独统计
+    pairs = lit[1:] & lit[:-1]
+    if pairs.any():
+        diffs = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2))
+        frozen_ratio = float((diffs[pairs] < FROZEN_THRESHOLD).mean())
+    else:
+        frozen_ratio = 0.0
+
+    black_ratio = float(black.mean())
+    blur_ratio = float(blurry.sum() / lit.sum()) if lit.any() else 0.0
+
+    issues = []
+    if black_ratio > MAX_BLACK_RATIO:
+        issues.append("黑屏")
+    if blur_ratio > MAX_BLUR_RATIO:
+        issues.append("模糊")
+    if frozen_ratio > MAX_FROZEN_RATIO:
+        issues.append("画面静止")
+
+    return {
+        "samples": int(k),
+        "brightness": round(float(brightness.mean()), 2),
+        "black_ratio": round(black_ratio, 3),
+        "blur_ratio": round(blur_ratio, 3),
+        "sharpness": round(float(np.median(sharpness[lit])) if lit.any() else 0.0, 2),
+        "frozen_ratio": round(frozen_ratio, 3),
+        "passed": not issues,
+        "issues": issues,
+    }
+
+
+def analyze_video(path: str, sample_count: int = 16, size: Tuple[int, int] = (160, 90)) -> dict:
+    """抽帧并评估视频内容质量（黑屏、模糊、静止、亮度）"""
+    frames, duration = read_samples(path, sample_count, size)
+    result = score_frames(frames)
+    result["duration"] = round(duration, 2)
+    return result
+
+
+def is_available() -> bool:
+    try:
+        import cv2  # noqa: F401
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class QualityAnalyzer:
+    """后台线程依次分析上传的视频，避免阻塞上传请求"""
+
+    def __init__(self, sample_count: int = 16):
+        self.sample_count = sample_count
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event: Optional[threading.Event] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive() and not self._stop_event.is_set():
+            return
+        # 每个工作线程有自己的停止标志，快速 stop/start 不会互相干扰
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """通知工作线程退出；正在分析的视频会先完成，不阻塞调用方"""
+        if self._stop_event:
+            self._stop_event.set()
+        self._thread = None
+
+    def submit(self, filepath: str, on_done: Callable[[dict], None]):
+        self._queue.put((filepath, on_done))
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                filepath, on_done = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                result = analyze_video(filepath, self.sample_count)
+            except Exception as e:
+                result = {"passed": False, "error": str(e)}
+            result["checked_at"] = datetime.now().isoformat(timespec="seconds")
+            try:
+                on_done(result)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 质量结果回调异常：{e}")
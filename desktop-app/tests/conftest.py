@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 测试直接导入 desktop-app 下的 server 包
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
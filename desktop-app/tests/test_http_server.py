@@ -0,0 +1,24 @@
+import io
+
+import pytest
+
+pytest.importorskip("flask")
+
+from server.http_server import HttpServer
+
+
+def test_upload_removes_file_when_journal_fails(tmp_path, monkeypatch):
+    server = HttpServer(str(tmp_path))
+
+    def fail(record):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(server.journal, "commit", fail)
+    response = server.app.test_client().post(
+        "/upload",
+        data={"trackingNumber": "SF1", "file": (io.BytesIO(b"video"), "a.mp4")},
+    )
+
+    assert response.status_code == 500
+    assert list(tmp_path.glob("*.mp4")) == []
+    assert list(tmp_path.glob("*.part")) == []
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import server.ingest_journal as ingest_journal
+from server.ingest_journal import IngestJournal, final_name_for, part_path_for
+
+
+def write_journal(directory: Path, *records, tail: str = ""):
+    lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    (directory / IngestJournal.JOURNAL_NAME).write_text(lines + tail, encoding="utf-8")
+
+
+def test_part_name_round_trip():
+    part = part_path_for(Path("/videos/SF1_10时20分30秒.mp4"), "deadbeef")
+    assert part.name == "SF1_10时20分30秒.mp4.deadbeef.part"
+    assert final_name_for(part) == "SF1_10时20分30秒.mp4"
+    assert final_name_for(Path("firefox_download.zip.part")) is None
+    assert final_name_for(Path("notes.part")) is None
+
+
+def test_recover_ignores_foreign_part_files(tmp_path):
+    (tmp_path / "firefox_download.zip.part").write_bytes(b"x")
+    (tmp_path / "notes.part").write_bytes(b"x")
+    (tmp_path / "A.mp4.deadbeef.part").write_bytes(b"x")
+
+    result = IngestJournal(tmp_path).recover()
+
+    assert result["incomplete"] == ["A.mp4.deadbeef.part"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["firefox_download.zip.part", "notes.part"]
+
+
+def test_load_truncates_torn_last_line(tmp_path):
+    write_journal(tmp_path, {"filename": "A.mp4", "size": 1}, tail='{"filena')
+
+    journal = IngestJournal(tmp_path)
+    assert set(journal.completed) == {"A.mp4"}
+
+    journal.commit({"filename": "B.mp4", "size": 2})
+    journal.stop()
+    assert set(IngestJournal(tmp_path).completed) == {"A.mp4", "B.mp4"}
+
+
+def test_recover_classifies_leftover_parts(tmp_path):
+    (tmp_path / "A.mp4").write_bytes(b"a")
+    (tmp_path / "A.mp4.1111aaaa.part").write_bytes(b"x")
+    (tmp_path / "B.mp4.2222bbbb.part").write_bytes(b"x")
+    write_journal(tmp_path, {"filename": "A.mp4", "size": 1})
+
+    result = IngestJournal(tmp_path).recover()
+
+    assert result["stale"] == ["A.mp4.1111aaaa.part"]
+    assert result["incomplete"] == ["B.mp4.2222bbbb.part"]
+    assert result["restored"] == []
+    assert list(tmp_path.glob("*.part")) == []
+
+
+def test_recover_rolls_forward_journaled_part(tmp_path):
+    (tmp_path / "A.mp4.deadbeef.part").write_bytes(b"12345")
+    write_journal(tmp_path, {"filename": "A.mp4", "size": 5})
+
+    result = IngestJournal(tmp_path).recover()
+
+    assert result["restored"] == ["A.mp4"]
+    assert result["missing"] == []
+    assert (tmp_path / "A.mp4").read_bytes() == b"12345"
+
+
+def test_recover_deletes_part_with_wrong_size(tmp_path):
+    (tmp_path / "A.mp4.deadbeef.part").write_bytes(b"123")
+    write_journal(tmp_path, {"filename": "A.mp4", "size": 5})
+
+    result = IngestJournal(tmp_path).recover()
+
+    assert result["restored"] == []
+    assert result["incomplete"] == ["A.mp4.deadbeef.part"]
+    assert not (tmp_path / "A.mp4").exists()
+
+
+def test_missing_files_reported_once_and_compacted(tmp_path):
+    (tmp_path / "A.mp4").write_bytes(b"a")
+    write_journal(tmp_path, {"filename": "A.mp4", "size": 1}, {"filename": "C.mp4", "size": 1})
+
+    assert IngestJournal(tmp_path).recover()["missing"] == ["C.mp4"]
+
+    journal = IngestJournal(tmp_path)
+    assert set(journal.completed) == {"A.mp4"}
+    assert journal.recover()["missing"] == []
+
+
+def test_commit_syncs_directory_before_journal(tmp_path, monkeypatch):
+    journal_file = tmp_path / IngestJournal.JOURNAL_NAME
+    seen = []
+
+    def fake_fsync_dir(directory):
+        text = journal_file.read_text(encoding="utf-8") if journal_file.exists() else ""
+        seen.append("A.mp4" in text)
+
+    monkeypatch.setattr(ingest_journal, "fsync_dir", fake_fsync_dir)
+    journal = IngestJournal(tmp_path)
+    journal.commit({"filename": "A.mp4", "size": 1})
+    journal.stop()
+
+    assert seen[0] is False
+
+
+def test_concurrent_commits_are_grouped(tmp_path, monkeypatch):
+    dir_syncs = []
+    release = threading.Event()
+
+    def slow_fsync_dir(directory):
+        dir_syncs.append(directory)
+        release.wait(5)
+
+    monkeypatch.setattr(ingest_journal, "fsync_dir", slow_fsync_dir)
+    journal = IngestJournal(tmp_path)
+
+    def commit(i):
+        journal.commit({"filename": f"{i}.mp4", "size": i})
+
+    # 第一条提交卡在 fsync 时，其余 19 条排队，放行后应合并为一批
+    first = threading.Thread(target=commit, args=(0,))
+    first.start()
+    while not dir_syncs:
+        time.sleep(0.001)
+    others = [threading.Thread(target=commit, args=(i,)) for i in range(1, 20)]
+    for t in others:
+        t.start()
+    while len(journal._pending) < len(others):
+        time.sleep(0.001)
+    release.set()
+    for t in [first] + others:
+        t.join(5)
+    journal.stop()
+
+    assert len(IngestJournal(tmp_path).completed) == 20
+    # 第一批：目录 + 新建日志后的目录；第二批：目录
+    assert len(dir_syncs) == 3
+
+
+def test_commit_after_stop_does_not_hang(tmp_path):
+    journal = IngestJournal(tmp_path)
+    journal.start()
+    journal.stop()
+    assert journal._thread is None
+
+    t = threading.Thread(target=journal.commit, args=({"filename": "A.mp4", "size": 1},))
+    t.start()
+    t.join(5)
+    assert not t.is_alive()
+    journal.stop()
+    assert set(IngestJournal(tmp_path).completed) == {"A.mp4"}
+
+
+def test_stop_drains_pending_commits(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(ingest_journal, "fsync_dir", lambda directory: release.wait(5))
+    journal = IngestJournal(tmp_path)
+    journal.start()
+    threads = [
+        threading.Thread(target=journal.commit, args=({"filename": f"{i}.mp4", "size": i},))
+        for i in range(5)
+    ]
+    for t in threads:
+        t.start()
+    stopper = threading.Thread(target=journal.stop)
+    stopper.start()
+    release.set()
+    stopper.join(5)
+    for t in threads:
+        t.join(5)
+
+    assert not any(t.is_alive() for t in threads + [stopper])
+    assert len(IngestJournal(tmp_path).completed) == 5
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from server.video_quality import score_frames
+
+
+def noisy(value, shape=(90, 160), seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(value + rng.normal(0, 20, shape), 0, 255).astype(np.float32)
+
+
+def test_all_black_is_only_black():
+    result = score_frames(np.zeros((16, 90, 160), np.float32))
+    assert result["issues"] == ["黑屏"]
+    assert result["frozen_ratio"] == 0.0
+
+
+def test_static_frame_is_frozen_not_black():
+    frame = noisy(128)
+    result = score_frames(np.stack([frame] * 16))
+    assert "画面静止" in result["issues"]
+    assert "黑屏" not in result["issues"]
+    assert "模糊" not in result["issues"]
+
+
+def test_single_frame():
+    result = score_frames(noisy(128)[None])
+    assert result["samples"] == 1
+    assert result["frozen_ratio"] == 0.0
+    assert result["passed"]
+
+
+def test_frozen_ratio_ignores_black_pairs():
+    black = np.zeros((90, 160), np.float32)
+    # 黑 黑 亮A 亮A 亮B 亮C：只有三对亮帧参与比较，其中一对静止
+    frames = np.stack([black, black, noisy(128, seed=1), noisy(128, seed=1),
+                       noisy(128, seed=2), noisy(128, seed=3)])
+    result = score_frames(frames)
+    assert result["black_ratio"] == round(2 / 6, 3)
+    assert result["frozen_ratio"] == round(1 / 3, 3)
+    assert result["passed"]
+
+
+def test_record_falls_back_to_sidecar(tmp_path):
+    pytest.importorskip("flask")
+    from server.http_server import HttpServer
+
+    record = {"filename": "SF1_10时00分00秒.mp4", "quality_status": "done", "quality": {"passed": True}}
+    (tmp_path / "SF1_10时00分00秒.quality.json").write_text(
+        json.dumps(record, ensure_ascii=False), encoding="utf-8")
+    client = HttpServer(str(tmp_path)).app.test_client()
+
+    assert client.get("/records/SF1_10时00分00秒.mp4").get_json() == record
+    assert client.get("/records/..").status_code == 404
+    assert client.get("/records/missing.mp4").status_code == 404
+
+
+def test_analyzer_restart_leaves_single_worker(monkeypatch):
+    import threading
+    import server.video_quality as video_quality
+
+    seen = []
+    done = threading.Event()
+    monkeypatch.setattr(video_quality, "analyze_video", lambda path, count: {"passed": True})
+    analyzer = video_quality.QualityAnalyzer()
+    analyzer.start()
+    old = analyzer._thread
+    analyzer.stop()
+    analyzer.start()
+    old.join(2)
+    assert not old.is_alive()
+
+    analyzer.submit("a.mp4", lambda result: (seen.append(result), done.set()))
+    assert done.wait(2)
+    assert seen[0]["passed"]
+    analyzer.stop()
+
+
+def test_pending_sidecar_requeued_on_start(tmp_path, monkeypatch):
+    pytest.importorskip("flask")
+    import threading
+    import server.http_server as http_server
+    import server.video_quality as video_quality
+
+    monkeypatch.setattr(video_quality, "is_available", lambda: True)
+    monkeypatch.setattr(http_server, "quality_available", lambda: True)
+    monkeypatch.setattr(video_quality, "analyze_video", lambda path, count: {"passed": True, "issues": []})
+    monkeypatch.setattr(http_server, "is_port_in_use", lambda port: False)
+
+    (tmp_path / "A.mp4").write_bytes(b"x")
+    record = {"filename": "A.mp4", "path": "/old/A.mp4", "quality_status": "pending", "quality": None}
+    (tmp_path / "A.quality.json").write_text(json.dumps(record), encoding="utf-8")
+
+    server = http_server.HttpServer(str(tmp_path), quality_check=True)
+    done = threading.Event()
+    original = server._on_quality_done
+    monkeypatch.setattr(server, "_on_quality_done", lambda rec, result: (original(rec, result), done.set()))
+    monkeypatch.setattr(server.app, "run", lambda **kwargs: None)
+    server.start()
+    assert done.wait(2)
+    server.stop()
+
+    saved = json.loads((tmp_path / "A.quality.json").read_text(encoding="utf-8"))
+    assert saved["quality_status"] == "done"
+    assert saved["path"] == str(tmp_path / "A.mp4")